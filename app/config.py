@@ -7,17 +7,25 @@ from pathlib import Path
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 # Database settings
-DATABASE_PATH = os.getenv("DATABASE_PATH", str(BASE_DIR / "data" / "keys.json"))
+DATABASE_PATH = os.getenv("DATABASE_PATH", str(BASE_DIR / "data" / "keys.db"))
+# Bytes of the database file SQLite may memory-map for reads (0 disables)
+DATABASE_MMAP_SIZE = int(os.getenv("DATABASE_MMAP_SIZE", str(256 * 1024 * 1024)))
 
 # Encryption settings
 MASTER_ENCRYPTION_PASSWORD = os.getenv(
     "MASTER_ENCRYPTION_PASSWORD", "los-master-key-2025-secure-password"
 )
 
+# Opt-in on-disk cache of the derived encryption key, to skip PBKDF2 on startup
+KDF_CACHE_ENABLED = os.getenv("LOS_KDF_CACHE") == "1"
+
 # Key generation settings
 KEY_LENGTH_BYTES = 32  # 256-bit keys
 MAX_ACTIVE_KEYS_PER_CLIENT = 2
 
+# Logging settings
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
 # API settings
 API_TITLE = "LOS Inbound Key Validation Service"
 API_VERSION = "1.0.0"
@@ -1,43 +1,120 @@
 """Cryptography utilities for key encryption/decryption
 
-This module handles encryption and decryption of secret keys using Fernet symmetric encryption.
+This module handles encryption and decryption of secret keys using AES-256-GCM.
 The master encryption key is derived from a password using PBKDF2.
 """
 
 import base64
-import secrets
+import binascii
+import hashlib
+import hmac
+import os
+import stat
+import tempfile
+from pathlib import Path
+from typing import Optional
 
-from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 
-from app.config import KEY_LENGTH_BYTES, MASTER_ENCRYPTION_PASSWORD
+from app.config import (
+    KDF_CACHE_ENABLED,
+    KEY_LENGTH_BYTES,
+    MASTER_ENCRYPTION_PASSWORD,
+)
+
+KDF_ITERATIONS = 100000
+
+
+def _kdf_cache_dir() -> Path:
+    """Directory of the KDF cache, resolved only when the cache is in use"""
+    return Path.home() / ".cache" / "los_keys"
+
+
+def _kdf_cache_path(password: str, salt: bytes) -> Path:
+    """Location of the cached key for a given password and salt"""
+    digest = hashlib.sha256(
+        password.encode() + salt + str(KDF_ITERATIONS).encode()
+    ).hexdigest()
+    return _kdf_cache_dir() / digest
+
+
+def _read_cached_key(cache_path: Path) -> Optional[bytes]:
+    """Read a cached key, ignoring files that are missing or not private"""
+    try:
+        if stat.S_IMODE(cache_path.stat().st_mode) != 0o600:
+            return None
+        key = cache_path.read_bytes()
+    except OSError:
+        return None
+    return key if len(key) == 32 else None
+
+
+def _write_cached_key(cache_path: Path, key: bytes):
+    """Atomically write a key to the cache with owner-only permissions"""
+    try:
+        cache_path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_path.parent)
+        with os.fdopen(fd, "wb") as f:
+            f.write(key)
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        # The cache is only an optimization; fall back to deriving each time
+        pass
 
 
 def derive_encryption_key(password: str) -> bytes:
     """Derive an encryption key from a password using PBKDF2.
 
+    When LOS_KDF_CACHE=1 is set, the derived key is cached on disk (mode 0600)
+    so that additional workers and test runs skip the PBKDF2 computation.
+
     Args:
         password: Master password for key derivation
 
     Returns:
-        Base64-encoded encryption key suitable for Fernet
+        Raw 32-byte encryption key suitable for AES-256-GCM
     """
     salt = b"static_salt_123"
 
+    cache_path = None
+    if KDF_CACHE_ENABLED:
+        try:
+            cache_path = _kdf_cache_path(password, salt)
+        except RuntimeError:
+            # No resolvable home directory; derive without the cache
+            pass
+    if cache_path is not None:
+        cached = _read_cached_key(cache_path)
+        if cached is not None:
+            return cached
+
     kdf = PBKDF2HMAC(
         algorithm=hashes.SHA256(),
         length=32,
         salt=salt,
-        iterations=100000,
+        iterations=KDF_ITERATIONS,
     )
-    key = base64.urlsafe_b64encode(kdf.derive(password.encode()))
+    key = kdf.derive(password.encode())
+
+    if cache_path is not None:
+        _write_cached_key(cache_path, key)
     return key
 
 
-# Global Fernet instance using derived key
-_fernet_key = derive_encryption_key(MASTER_ENCRYPTION_PASSWORD)
-_fernet = Fernet(_fernet_key)
+# Size in bytes of the random nonce prepended to each ciphertext
+NONCE_LENGTH_BYTES = 12
+
+# Global AES-GCM instance using derived key
+_encryption_key = derive_encryption_key(MASTER_ENCRYPTION_PASSWORD)
+_aead = AESGCM(_encryption_key)
+
+# Separate key for secret fingerprints, derived from the encryption key
+_fingerprint_key = hmac.new(
+    _encryption_key, b"secret-fingerprint", hashlib.sha256
+).digest()
 
 
 def generate_secret_key() -> str:
@@ -46,8 +123,8 @@ def generate_secret_key() -> str:
     Returns:
         Base64-encoded random secret key
     """
-    random_bytes = secrets.token_bytes(KEY_LENGTH_BYTES)
-    return base64.b64encode(random_bytes).decode("utf-8")
+    random_bytes = os.urandom(KEY_LENGTH_BYTES)
+    return binascii.b2a_base64(random_bytes, newline=False).decode("ascii")
 
 
 def encrypt_secret(plaintext_secret: str) -> str:
@@ -57,10 +134,11 @@ def encrypt_secret(plaintext_secret: str) -> str:
         plaintext_secret: The plaintext secret to encrypt
 
     Returns:
-        Encrypted secret as a base64-encoded string
+        Base64-encoded nonce followed by the AES-GCM ciphertext and tag
     """
-    encrypted = _fernet.encrypt(plaintext_secret.encode("utf-8"))
-    return encrypted.decode("utf-8")
+    nonce = os.urandom(NONCE_LENGTH_BYTES)
+    encrypted = _aead.encrypt(nonce, plaintext_secret.encode("utf-8"), None)
+    return base64.b64encode(nonce + encrypted).decode("ascii")
 
 
 def decrypt_secret(encrypted_secret: str) -> str:
@@ -73,20 +151,40 @@ def decrypt_secret(encrypted_secret: str) -> str:
         Decrypted plaintext secret
 
     Raises:
-        Exception: If decryption fails (invalid token, wrong key, etc.)
+        ValueError: If decryption fails (malformed data, wrong key, etc.)
     """
     try:
-        decrypted = _fernet.decrypt(encrypted_secret.encode("utf-8"))
+        payload = base64.b64decode(encrypted_secret.encode("ascii"))
+        nonce, encrypted = payload[:NONCE_LENGTH_BYTES], payload[NONCE_LENGTH_BYTES:]
+        decrypted = _aead.decrypt(nonce, encrypted, None)
         return decrypted.decode("utf-8")
     except Exception as e:
         raise ValueError(f"Failed to decrypt secret: {str(e)}")
 
 
+def fingerprint_secret(plaintext_secret: str) -> str:
+    """Compute a deterministic keyed fingerprint of a plaintext secret.
+
+    The fingerprint is an HMAC-SHA256 under a server-side key, so it can be
+    stored and indexed to look up a secret without decrypting anything.
+
+    Args:
+        plaintext_secret: The plaintext secret to fingerprint
+
+    Returns:
+        Hex-encoded HMAC-SHA256 digest
+    """
+    return hmac.new(
+        _fingerprint_key, plaintext_secret.encode("utf-8"), hashlib.sha256
+    ).hexdigest()
+
+
 def compare_secrets(plaintext_secret: str, encrypted_secret: str) -> bool:
     """Safely compare a plaintext secret with an encrypted secret.
 
-    This function decrypts the encrypted secret and performs a constant-time
-    comparison to prevent timing attacks.
+    This function decrypts the encrypted secret and compares the fingerprints
+    of both values in constant time. The fingerprints have a fixed length, so
+    the comparison time does not depend on the secrets or their lengths.
 
     Args:
         plaintext_secret: The plaintext secret to compare
@@ -94,10 +192,11 @@ def compare_secrets(plaintext_secret: str, encrypted_secret: str) -> bool:
 
     Returns:
         True if secrets match, False otherwise
+
+    Raises:
+        ValueError: If the encrypted secret cannot be decrypted
     """
-    try:
-        decrypted = decrypt_secret(encrypted_secret)
-        # Use constant-time comparison to prevent timing attacks
-        return secrets.compare_digest(plaintext_secret, decrypted)
-    except Exception:
-        return False
+    decrypted = decrypt_secret(encrypted_secret)
+    return hmac.compare_digest(
+        fingerprint_secret(plaintext_secret), fingerprint_secret(decrypted)
+    )
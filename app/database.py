@@ -1,45 +1,157 @@
 """Database operations for the LOS Key Validation Service
 
-This module provides a simple JSON file-based database for storing key records.
-In production, this would be replaced with a real database (PostgreSQL, MongoDB, etc.)
+This module provides a SQLite-backed database for storing key records.
+In production, this would be replaced with a database server (PostgreSQL, etc.)
 """
 
-import json
 import os
-from datetime import datetime
-from typing import Dict, List, Optional
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.config import DATABASE_MMAP_SIZE, DATABASE_PATH
+from app.models import KeyRecord, KeyStatus, utc_now
+
+# Column order of the keys table, matching the KeyRecord fields
+_COLUMNS = (
+    "id",
+    "client_id",
+    "key_alias",
+    "encrypted_secret",
+    "secret_fingerprint",
+    "status",
+    "expiration_date",
+    "created_by",
+    "created_at",
+    "deactivated_at",
+    "created_seq",
+    "expiration_ts",
+)
+_SELECT = f"SELECT {', '.join(_COLUMNS)} FROM keys"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS keys (
+    id TEXT PRIMARY KEY,
+    client_id TEXT NOT NULL,
+    key_alias TEXT NOT NULL,
+    encrypted_secret TEXT NOT NULL,
+    secret_fingerprint TEXT NOT NULL,
+    status TEXT NOT NULL,
+    expiration_date TEXT,
+    created_by TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    deactivated_at TEXT,
+    created_seq INTEGER NOT NULL,
+    expiration_ts REAL
+);
+CREATE INDEX IF NOT EXISTS idx_client_status_seq
+    ON keys(client_id, status, created_seq);
+CREATE INDEX IF NOT EXISTS idx_fp ON keys(client_id, secret_fingerprint);
+"""
+
+_ACTIVE_STATUSES = (KeyStatus.ACTIVE.value, KeyStatus.PENDING_DEACTIVATION.value)
+_DATETIME_COLUMNS = ("expiration_date", "created_at", "deactivated_at")
+
+
+def _naive_utc(value: datetime) -> datetime:
+    """Normalize a datetime to the naive UTC form used throughout the service"""
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
 
-from app.config import DATABASE_PATH
-from app.models import KeyRecord, KeyStatus
+def _to_db(value: Any) -> Any:
+    """Convert a model value to its SQLite representation"""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return _naive_utc(value).isoformat()
+    return value
+
+
+def _row_to_record(row: tuple) -> KeyRecord:
+    """Build a KeyRecord from a row selected with _COLUMNS
+
+    Rows are validated as KeyRecords before they are written (add_key takes
+    a KeyRecord, update_key validates the merged record), so the record is
+    built with model_construct and only the enum and datetime columns are
+    converted. Datetimes are parsed once here into naive UTC, so callers never need to
+    handle strings or offsets.
+    """
+    fields = dict(zip(_COLUMNS, row))
+    fields["status"] = KeyStatus(fields["status"])
+    for column in _DATETIME_COLUMNS:
+        if fields[column] is not None:
+            fields[column] = _naive_utc(datetime.fromisoformat(fields[column]))
+    return KeyRecord.model_construct(**fields)
 
 
 class KeyDatabase:
-    """Simple JSON file-based database for key records"""
+    """SQLite-backed database for key records"""
 
     def __init__(self, db_path: str = DATABASE_PATH):
         self.db_path = db_path
-        self._ensure_database_exists()
-
-    def _ensure_database_exists(self):
-        """Ensure the database file exists with proper structure"""
-        if not os.path.exists(self.db_path):
-            # Create parent directory if it doesn't exist
-            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-            # Initialize empty database
-            self._write_data({"keys": []})
-        elif os.path.getsize(self.db_path) == 0:
-            # File exists but is empty, initialize it
-            self._write_data({"keys": []})
-
-    def _read_data(self) -> Dict:
-        """Read the entire database"""
-        with open(self.db_path, "r") as f:
-            return json.load(f)
-
-    def _write_data(self, data: Dict):
-        """Write the entire database"""
-        with open(self.db_path, "w") as f:
-            json.dump(data, f, indent=2, default=str)
+        # Serializes access to the shared connection across request threads;
+        # reentrant so that methods can be called inside transaction()
+        self._lock = threading.RLock()
+        self._conn = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database and ensure the schema exists"""
+        parent = os.path.dirname(self.db_path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+
+        conn = sqlite3.connect(
+            self.db_path, check_same_thread=False, isolation_level=None
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        # Read pages straight from the page cache instead of copying via read()
+        conn.execute(f"PRAGMA mmap_size={int(DATABASE_MMAP_SIZE)}")
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def _fetchone(self, sql: str, params: tuple = ()) -> Optional[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()
+
+    def _fetchall(self, sql: str, params: tuple = ()) -> List[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Run the enclosed database calls as one atomic write transaction
+
+        BEGIN IMMEDIATE takes SQLite's write lock up front, so concurrent
+        writers in this process and in other processes sharing the database
+        file are serialized until the transaction commits or rolls back.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+                self._conn.execute("COMMIT")
+            except BaseException:
+                # A failed COMMIT (e.g. SQLITE_BUSY) leaves the transaction
+                # open; roll it back so the shared connection stays usable
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                raise
+
+    def close(self):
+        """Close the underlying database connection"""
+        with self._lock:
+            self._conn.close()
+
+    def clear(self):
+        """Delete all key records from the database"""
+        with self._lock:
+            self._conn.execute("DELETE FROM keys")
 
     def add_key(self, key_record: KeyRecord) -> KeyRecord:
         """Add a new key record to the database
@@ -50,11 +162,13 @@ class KeyDatabase:
         Returns:
             The added key record
         """
-        data = self._read_data()
-        # Convert to dict for JSON serialization
-        key_dict = key_record.model_dump(mode="json")
-        data["keys"].append(key_dict)
-        self._write_data(data)
+        placeholders = ", ".join("?" for _ in _COLUMNS)
+        values = tuple(_to_db(getattr(key_record, col)) for col in _COLUMNS)
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO keys ({', '.join(_COLUMNS)}) VALUES ({placeholders})",
+                values,
+            )
         return key_record
 
     def get_key_by_id(self, key_id: str) -> Optional[KeyRecord]:
@@ -66,11 +180,8 @@ class KeyDatabase:
         Returns:
             The key record if found, None otherwise
         """
-        data = self._read_data()
-        for key_dict in data["keys"]:
-            if key_dict["id"] == key_id:
-                return KeyRecord(**key_dict)
-        return None
+        row = self._fetchone(f"{_SELECT} WHERE id = ?", (key_id,))
+        return _row_to_record(row) if row else None
 
     def get_keys_by_client(self, client_id: str) -> List[KeyRecord]:
         """Get all key records for a specific client
@@ -81,12 +192,10 @@ class KeyDatabase:
         Returns:
             List of key records for the client
         """
-        data = self._read_data()
-        keys = []
-        for key_dict in data["keys"]:
-            if key_dict["client_id"] == client_id:
-                keys.append(KeyRecord(**key_dict))
-        return keys
+        rows = self._fetchall(
+            f"{_SELECT} WHERE client_id = ? ORDER BY rowid", (client_id,)
+        )
+        return [_row_to_record(row) for row in rows]
 
     def get_active_keys(self, client_id: str) -> List[KeyRecord]:
         """Get all active keys for a specific client
@@ -97,48 +206,117 @@ class KeyDatabase:
         Returns:
             List of active key records
         """
-        all_keys = self.get_keys_by_client(client_id)
-        return [
-            key
-            for key in all_keys
-            if key.status in [KeyStatus.ACTIVE, KeyStatus.PENDING_DEACTIVATION]
-        ]
+        rows = self._fetchall(
+            f"{_SELECT} WHERE client_id = ? AND status IN (?, ?) ORDER BY rowid",
+            (client_id, *_ACTIVE_STATUSES),
+        )
+        return [_row_to_record(row) for row in rows]
+
+    def count_active_keys(self, client_id: str) -> int:
+        """Count the active keys for a specific client
+
+        Args:
+            client_id: The client identifier
+
+        Returns:
+            Number of active key records
+        """
+        row = self._fetchone(
+            "SELECT COUNT(*) FROM keys WHERE client_id = ? AND status IN (?, ?)",
+            (client_id, *_ACTIVE_STATUSES),
+        )
+        return row[0]
 
     def update_key(self, key_id: str, updates: Dict) -> Optional[KeyRecord]:
         """Update a key record
 
+        The updated record is validated as a whole before anything is written,
+        so every stored row stays readable through _row_to_record.
+
         Args:
             key_id: The unique key identifier
             updates: Dictionary of fields to update
 
         Returns:
             Updated key record if found, None otherwise
+
+        Raises:
+            ValueError: If updates contains an unknown or immutable field, or
+                a value that does not validate as a KeyRecord field
         """
-        data = self._read_data()
-        for i, key_dict in enumerate(data["keys"]):
-            if key_dict["id"] == key_id:
-                # Update fields
-                key_dict.update(updates)
-                data["keys"][i] = key_dict
-                self._write_data(data)
-                return KeyRecord(**key_dict)
-        return None
-
-    def deactivate_key(self, key_id: str) -> Optional[KeyRecord]:
+        # expiration_ts is derived from expiration_date and never set directly
+        invalid = set(updates) - set(_COLUMNS[1:-1])
+        if invalid:
+            raise ValueError(f"Cannot update fields: {', '.join(sorted(invalid))}")
+
+        with self._lock:
+            current = self.get_key_by_id(key_id)
+            if current is None or not updates:
+                return current
+
+            fields = {**current.model_dump(), **updates}
+            changed = list(updates)
+            if "expiration_date" in updates:
+                # Let the model validator derive the new expiration_ts
+                fields["expiration_ts"] = None
+                changed.append("expiration_ts")
+            key_record = KeyRecord.model_validate(fields)
+
+            assignments = ", ".join(f"{field} = ?" for field in changed)
+            values = tuple(_to_db(getattr(key_record, field)) for field in changed)
+            self._conn.execute(
+                f"UPDATE keys SET {assignments} WHERE id = ?", (*values, key_id)
+            )
+        return key_record
+
+    def deactivate_key(
+        self, key_id: str, now: Optional[datetime] = None
+    ) -> Optional[KeyRecord]:
         """Deactivate a key
 
         Args:
             key_id: The unique key identifier
+            now: Deactivation timestamp (default: current UTC time)
 
         Returns:
             Updated key record if found, None otherwise
         """
         updates = {
             "status": KeyStatus.INACTIVE.value,
-            "deactivated_at": datetime.utcnow().isoformat(),
+            "deactivated_at": now or utc_now(),
         }
         return self.update_key(key_id, updates)
 
+    def deactivate_oldest_active_keys(
+        self, client_id: str, keep: int, now: Optional[datetime] = None
+    ) -> List[KeyRecord]:
+        """Deactivate all but the newest active keys of a client
+
+        Args:
+            client_id: The client identifier
+            keep: Number of newest active keys to leave untouched
+            now: Deactivation timestamp (default: current UTC time)
+
+        Returns:
+            List of key records that were deactivated
+        """
+        deactivated_at = _to_db(now or utc_now())
+        with self._lock:
+            rows = self._conn.execute(
+                "UPDATE keys SET status = ?, deactivated_at = ? WHERE id IN ("
+                "SELECT id FROM keys WHERE client_id = ? AND status IN (?, ?) "
+                "ORDER BY created_seq DESC, rowid DESC LIMIT -1 OFFSET ?"
+                f") RETURNING {', '.join(_COLUMNS)}",
+                (
+                    KeyStatus.INACTIVE.value,
+                    deactivated_at,
+                    client_id,
+                    *_ACTIVE_STATUSES,
+                    max(keep, 0),
+                ),
+            ).fetchall()
+        return [_row_to_record(row) for row in rows]
+
     def find_key_by_encrypted_secret(
         self, client_id: str, encrypted_secret: str
     ) -> Optional[KeyRecord]:
@@ -151,11 +329,29 @@ class KeyDatabase:
         Returns:
             The matching key record if found, None otherwise
         """
-        keys = self.get_keys_by_client(client_id)
-        for key in keys:
-            if key.encrypted_secret == encrypted_secret:
-                return key
-        return None
+        row = self._fetchone(
+            f"{_SELECT} WHERE client_id = ? AND encrypted_secret = ?",
+            (client_id, encrypted_secret),
+        )
+        return _row_to_record(row) if row else None
+
+    def find_key_by_fingerprint(
+        self, client_id: str, secret_fingerprint: str
+    ) -> Optional[KeyRecord]:
+        """Find a key by the fingerprint of its plaintext secret
+
+        Args:
+            client_id: The client identifier
+            secret_fingerprint: The secret fingerprint to search for
+
+        Returns:
+            The matching key record if found, None otherwise
+        """
+        row = self._fetchone(
+            f"{_SELECT} WHERE client_id = ? AND secret_fingerprint = ?",
+            (client_id, secret_fingerprint),
+        )
+        return _row_to_record(row) if row else None
 
     def get_all_keys(self) -> List[KeyRecord]:
         """Get all key records in the database
@@ -163,8 +359,8 @@ class KeyDatabase:
         Returns:
             List of all key records
         """
-        data = self._read_data()
-        return [KeyRecord(**key_dict) for key_dict in data["keys"]]
+        rows = self._fetchall(f"{_SELECT} ORDER BY rowid")
+        return [_row_to_record(row) for row in rows]
 
 
 # Global database instance
@@ -10,9 +10,9 @@ from datetime import datetime
 from typing import Optional
 
 from app.config import MAX_ACTIVE_KEYS_PER_CLIENT
-from app.crypto import encrypt_secret, generate_secret_key
+from app.crypto import encrypt_secret, fingerprint_secret, generate_secret_key
 from app.database import db
-from app.models import CreateKeyResponse, KeyRecord, KeyStatus
+from app.models import CreateKeyResponse, KeyRecord, KeyStatus, utc_now
 
 logger = logging.getLogger(__name__)
 
@@ -49,43 +49,20 @@ def create_key(
         },
     )
 
-    # Get current active keys for this client
-    active_keys = db.get_active_keys(client_id)
-    logger.debug(
-        "Retrieved active keys for client",
-        extra={"client_id": client_id, "active_key_count": len(active_keys)},
-    )
-
-    if len(active_keys) > 2:
-        # Deactivate the oldest active key
-        oldest_key = min(active_keys, key=lambda k: k.created_at)
-        logger.warning(
-            "Too many active keys, deactivating oldest key",
-            extra={
-                "client_id": client_id,
-                "active_key_count": len(active_keys),
-                "oldest_key_id": oldest_key.id,
-                "oldest_key_alias": oldest_key.key_alias,
-                "oldest_key_created_at": oldest_key.created_at,
-            },
-        )
-        db.deactivate_key(oldest_key.id)
-        logger.info(
-            "Deactivated oldest key",
-            extra={"client_id": client_id, "deactivated_key_id": oldest_key.id},
-        )
+    now = utc_now()
 
     # Generate new secret key
     logger.debug("Generating new secret key")
     plaintext_secret = generate_secret_key()
     encrypted = encrypt_secret(plaintext_secret)
-    logger.debug(
-        "Secret key generated and encrypted",
-        extra={
-            "client_id": client_id,
-            "encrypted": encrypted,
-        },
-    )
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Secret key generated and encrypted",
+            extra={
+                "client_id": client_id,
+                "encrypted": encrypted,
+            },
+        )
 
     # Create key record
     key_record = KeyRecord(
@@ -93,15 +70,35 @@ def create_key(
         client_id=client_id,
         key_alias=key_alias,
         encrypted_secret=encrypted,
+        secret_fingerprint=fingerprint_secret(plaintext_secret),
         status=KeyStatus.ACTIVE,
         expiration_date=expiration_date,
         created_by=created_by,
-        created_at=datetime.utcnow(),
+        created_at=now,
     )
 
-    # Save to database
-    logger.debug("Saving key record to database", extra={"key_id": key_record.id})
-    db.add_key(key_record)
+    # Rotate out old keys and insert the new one atomically, so concurrent
+    # requests for the same client cannot exceed the active key limit.
+    # Keep at most MAX_ACTIVE_KEYS_PER_CLIENT - 1 of the newest active keys.
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Saving key record to database", extra={"key_id": key_record.id})
+    with db.transaction():
+        deactivated_keys = db.deactivate_oldest_active_keys(
+            client_id, keep=MAX_ACTIVE_KEYS_PER_CLIENT - 1, now=now
+        )
+        db.add_key(key_record)
+
+    for oldest_key in deactivated_keys:
+        logger.warning(
+            "Too many active keys, deactivated oldest key",
+            extra={
+                "client_id": client_id,
+                "deactivated_key_id": oldest_key.id,
+                "oldest_key_alias": oldest_key.key_alias,
+                "oldest_key_created_at": oldest_key.created_at,
+            },
+        )
+
     logger.info(
         "Key created successfully",
         extra={
@@ -131,7 +128,8 @@ def get_key_status(key_id: str) -> Optional[KeyRecord]:
     Returns:
         KeyRecord if found, None otherwise
     """
-    logger.debug("Retrieving key status", extra={"key_id": key_id})
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Retrieving key status", extra={"key_id": key_id})
     key_record = db.get_key_by_id(key_id)
     if key_record:
         logger.info(
@@ -175,7 +173,8 @@ def list_keys_for_client(client_id: str) -> list[KeyRecord]:
     Returns:
         List of KeyRecord objects
     """
-    logger.debug("Listing keys for client", extra={"client_id": client_id})
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Listing keys for client", extra={"client_id": client_id})
     keys = db.get_keys_by_client(client_id)
     logger.info(
         "Retrieved keys for client",
@@ -195,9 +194,11 @@ def get_active_key_count(client_id: str) -> int:
     Returns:
         Number of active keys
     """
-    logger.debug("Getting active key count for client", extra={"client_id": client_id})
-    active_keys = db.get_active_keys(client_id)
-    count = len(active_keys)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Getting active key count for client", extra={"client_id": client_id}
+        )
+    count = db.count_active_keys(client_id)
     logger.info(
         "Active key count retrieved",
         extra={"client_id": client_id, "active_key_count": count},
@@ -22,15 +22,17 @@ class ExtraFormatter(logging.Formatter):
         # Get the base formatted message
         base_msg = super().format(record)
 
-        # Find extra fields (anything not in standard attributes)
-        extra_fields = {
-            key: value for key, value in record.__dict__.items()
-            if key not in self.STANDARD_ATTRS and not key.startswith('_')
-        }
-
-        # If there are extra fields, append them
-        if extra_fields:
-            extra_str = ' '.join(f'{k}={v}' for k, v in extra_fields.items())
+        # Set difference runs in C; most records carry no extras at all
+        extra_keys = record.__dict__.keys() - self.STANDARD_ATTRS
+        if not extra_keys:
+            return base_msg
+
+        # Keep the original insertion order of the extra fields
+        extra_str = ' '.join(
+            f'{key}={value}' for key, value in record.__dict__.items()
+            if key in extra_keys and not key.startswith('_')
+        )
+        if extra_str:
             return f'{base_msg} [{extra_str}]'
 
         return base_msg
@@ -9,7 +9,7 @@ from typing import List
 from fastapi import FastAPI, HTTPException, status
 from fastapi.responses import JSONResponse
 
-from app.config import API_DESCRIPTION, API_TITLE, API_VERSION
+from app.config import API_DESCRIPTION, API_TITLE, API_VERSION, LOG_LEVEL
 from app.key_service import (
     create_key,
     deactivate_key,
@@ -30,14 +30,15 @@ from app.models import (
 from app.validation_service import validate_key
 
 # Configure logging
-setup_logging(level=logging.DEBUG)
+setup_logging(level=getattr(logging, LOG_LEVEL, logging.INFO))
+logger = logging.getLogger(__name__)
 
 # Initialize FastAPI app
 app = FastAPI(title=API_TITLE, version=API_VERSION, description=API_DESCRIPTION)
 
 
 @app.get("/")
-def read_root():
+async def read_root():
     """Root endpoint with API debugging information"""
     return {
         "service": "LOS Inbound Key Validation Service",
@@ -48,7 +49,7 @@ def read_root():
 
 
 @app.get("/health")
-def health_check():
+async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "service": "los-key-validation"}
 
@@ -216,10 +217,14 @@ def validate_key_endpoint(request: ValidateKeyRequest):
     try:
         result = validate_key(request.client_id, request.secret_key)
         return ValidateKeyResponse(**result)
-    except Exception as e:
+    except Exception:
+        # Log the details server-side; clients only see a generic error
+        logger.exception(
+            "Key validation failed", extra={"client_id": request.client_id}
+        )
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Validation failed: {str(e)}",
+            detail="Validation failed",
         )
 
 
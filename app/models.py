@@ -1,10 +1,25 @@
 """Pydantic models for the LOS Key Validation Service"""
 
-from datetime import datetime
+import time
+from datetime import datetime, timezone
 from enum import Enum
 from typing import Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
+
+
+def utc_now() -> datetime:
+    """Current UTC time as a naive datetime, without deprecated utcnow()"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def expiration_timestamp(expiration: Optional[datetime]) -> Optional[float]:
+    """Unix epoch seconds for an expiration date; naive datetimes are UTC"""
+    if expiration is None:
+        return None
+    if expiration.tzinfo is None:
+        expiration = expiration.replace(tzinfo=timezone.utc)
+    return expiration.timestamp()
 
 
 class KeyStatus(str, Enum):
@@ -24,20 +39,34 @@ class KeyRecord(BaseModel):
     )
     key_alias: str = Field(..., description="Human-readable key name")
     encrypted_secret: str = Field(..., description="Encrypted secret key")
+    secret_fingerprint: str = Field(
+        ..., description="HMAC fingerprint of the plaintext secret key"
+    )
     status: KeyStatus = Field(default=KeyStatus.ACTIVE, description="Key status")
     expiration_date: Optional[datetime] = Field(
         None, description="Optional expiration date"
     )
     created_by: str = Field(..., description="User who created the key")
     created_at: datetime = Field(
-        default_factory=datetime.utcnow, description="Creation timestamp"
+        default_factory=utc_now, description="Creation timestamp"
     )
     deactivated_at: Optional[datetime] = Field(
         None, description="Deactivation timestamp"
     )
+    created_seq: int = Field(
+        default_factory=time.time_ns,
+        description="Creation sequence (ns since epoch) used to order keys",
+    )
+    expiration_ts: Optional[float] = Field(
+        None, description="Expiration as Unix epoch seconds, set from expiration_date"
+    )
 
-    class Config:
-        json_encoders = {datetime: lambda v: v.isoformat() if v else None}
+    @model_validator(mode="after")
+    def set_expiration_ts(self) -> "KeyRecord":
+        """Precompute the expiration timestamp so validation is a float compare"""
+        if self.expiration_ts is None:
+            self.expiration_ts = expiration_timestamp(self.expiration_date)
+        return self
 
 
 class CreateKeyRequest(BaseModel):
@@ -77,7 +106,6 @@ class ValidateKeyResponse(BaseModel):
     valid: bool
     message: str
     error: Optional[str] = None
-    debug_info: Optional[str] = None
 
 
 class KeyStatusResponse(BaseModel):
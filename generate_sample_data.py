@@ -1,126 +1,145 @@
 """Script to generate sample data for the database
 
-Run this script to populate the keys.json file with sample data.
+Run this script to populate the keys database with sample data.
 """
 
-import json
 import sys
+import time
 from datetime import datetime, timedelta
 from pathlib import Path
+from typing import NamedTuple, Optional, Tuple
 
 # Add app to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from app.crypto import encrypt_secret, generate_secret_key
-from app.models import KeyStatus
+from app.crypto import encrypt_secret, fingerprint_secret, generate_secret_key
+from app.database import db
+from app.models import KeyRecord, KeyStatus, utc_now
+
+NS_PER_DAY = 24 * 60 * 60 * 10**9
+
+
+class SampleKey(NamedTuple):
+    """A sample key, with times in days relative to when the data is generated"""
+
+    label: str
+    id: str
+    client_id: str
+    key_alias: str
+    status: KeyStatus
+    expires_in_days: int
+    created_days_ago: int
+    deactivated_days_ago: Optional[int] = None
+
+
+SAMPLE_KEYS = (
+    SampleKey(
+        label="MLM_PROD Active Key 1",
+        id="mlm-prod-key-001",
+        client_id="MLM_PROD",
+        key_alias="MLM Prod Key 2025-Q1",
+        status=KeyStatus.ACTIVE,
+        expires_in_days=90,
+        created_days_ago=30,
+    ),
+    SampleKey(
+        label="MLM_PROD Active Key 2",
+        id="mlm-prod-key-002",
+        client_id="MLM_PROD",
+        key_alias="MLM Prod Key 2025-Q2",
+        status=KeyStatus.ACTIVE,
+        expires_in_days=180,
+        created_days_ago=5,
+    ),
+    SampleKey(
+        label="MLM_PROD Inactive Key",
+        id="mlm-prod-key-003-inactive",
+        client_id="MLM_PROD",
+        key_alias="MLM Prod Key 2024-Q4 (Deactivated)",
+        status=KeyStatus.INACTIVE,
+        expires_in_days=-10,
+        created_days_ago=120,
+        deactivated_days_ago=10,
+    ),
+    SampleKey(
+        label="MLCES_PROD Active Key",
+        id="mlces-prod-key-001",
+        client_id="MLCES_PROD",
+        key_alias="MLCES Prod Key 2025-Q1",
+        status=KeyStatus.ACTIVE,
+        expires_in_days=90,
+        created_days_ago=20,
+    ),
+    SampleKey(
+        label="MLCWS_PROD Pending Key",
+        id="mlcws-prod-key-001",
+        client_id="MLCWS_PROD",
+        key_alias="MLCWS Prod Key 2025-Q1",
+        status=KeyStatus.PENDING_DEACTIVATION,
+        expires_in_days=30,
+        created_days_ago=60,
+    ),
+    SampleKey(
+        label="MLCWS_PROD Expired Key",
+        id="mlcws-prod-key-002-expired",
+        client_id="MLCWS_PROD",
+        key_alias="MLCWS Prod Key 2024-Q3 (Expired)",
+        status=KeyStatus.INACTIVE,
+        expires_in_days=-60,
+        created_days_ago=150,
+        deactivated_days_ago=60,
+    ),
+)
+
+
+def _make_key(sample: SampleKey, now: datetime, now_ns: int) -> Tuple[str, KeyRecord]:
+    """Build a sample key record relative to the given time
+
+    Returns:
+        Tuple of the plaintext secret and its key record
+    """
+    plaintext = generate_secret_key()
+    key_record = KeyRecord(
+        id=sample.id,
+        client_id=sample.client_id,
+        key_alias=sample.key_alias,
+        encrypted_secret=encrypt_secret(plaintext),
+        secret_fingerprint=fingerprint_secret(plaintext),
+        status=sample.status,
+        expiration_date=now + timedelta(days=sample.expires_in_days),
+        created_by="admin",
+        created_at=now - timedelta(days=sample.created_days_ago),
+        deactivated_at=(
+            now - timedelta(days=sample.deactivated_days_ago)
+            if sample.deactivated_days_ago is not None
+            else None
+        ),
+        created_seq=now_ns - sample.created_days_ago * NS_PER_DAY,
+    )
+    return plaintext, key_record
 
 
 def generate_sample_data():
     """Generate sample key data"""
 
-    # Generate some sample keys
-    keys = []
+    now = utc_now()
+    now_ns = time.time_ns()
 
-    # MLM_PROD: 2 active keys
-    mlm_key1_plain = generate_secret_key()
-    mlm_key1 = {
-        "id": "mlm-prod-key-001",
-        "client_id": "MLM_PROD",
-        "key_alias": "MLM Prod Key 2025-Q1",
-        "encrypted_secret": encrypt_secret(mlm_key1_plain),
-        "status": KeyStatus.ACTIVE.value,
-        "expiration_date": (datetime.utcnow() + timedelta(days=90)).isoformat() + "Z",
-        "created_by": "admin",
-        "created_at": (datetime.utcnow() - timedelta(days=30)).isoformat() + "Z",
-        "deactivated_at": None,
-    }
-    keys.append(mlm_key1)
-
-    mlm_key2_plain = generate_secret_key()
-    mlm_key2 = {
-        "id": "mlm-prod-key-002",
-        "client_id": "MLM_PROD",
-        "key_alias": "MLM Prod Key 2025-Q2",
-        "encrypted_secret": encrypt_secret(mlm_key2_plain),
-        "status": KeyStatus.ACTIVE.value,
-        "expiration_date": (datetime.utcnow() + timedelta(days=180)).isoformat() + "Z",
-        "created_by": "admin",
-        "created_at": (datetime.utcnow() - timedelta(days=5)).isoformat() + "Z",
-        "deactivated_at": None,
-    }
-    keys.append(mlm_key2)
-
-    # MLM_PROD: 1 inactive key
-    mlm_key3_plain = generate_secret_key()
-    mlm_key3 = {
-        "id": "mlm-prod-key-003-inactive",
-        "client_id": "MLM_PROD",
-        "key_alias": "MLM Prod Key 2024-Q4 (Deactivated)",
-        "encrypted_secret": encrypt_secret(mlm_key3_plain),
-        "status": KeyStatus.INACTIVE.value,
-        "expiration_date": (datetime.utcnow() - timedelta(days=10)).isoformat() + "Z",
-        "created_by": "admin",
-        "created_at": (datetime.utcnow() - timedelta(days=120)).isoformat() + "Z",
-        "deactivated_at": (datetime.utcnow() - timedelta(days=10)).isoformat() + "Z",
-    }
-    keys.append(mlm_key3)
-
-    # MLCES_PROD: 1 active key
-    mlces_key1_plain = generate_secret_key()
-    mlces_key1 = {
-        "id": "mlces-prod-key-001",
-        "client_id": "MLCES_PROD",
-        "key_alias": "MLCES Prod Key 2025-Q1",
-        "encrypted_secret": encrypt_secret(mlces_key1_plain),
-        "status": KeyStatus.ACTIVE.value,
-        "expiration_date": (datetime.utcnow() + timedelta(days=90)).isoformat() + "Z",
-        "created_by": "admin",
-        "created_at": (datetime.utcnow() - timedelta(days=20)).isoformat() + "Z",
-        "deactivated_at": None,
-    }
-    keys.append(mlces_key1)
-
-    # MLCWS_PROD: 1 active key with pending deactivation
-    mlcws_key1_plain = generate_secret_key()
-    mlcws_key1 = {
-        "id": "mlcws-prod-key-001",
-        "client_id": "MLCWS_PROD",
-        "key_alias": "MLCWS Prod Key 2025-Q1",
-        "encrypted_secret": encrypt_secret(mlcws_key1_plain),
-        "status": KeyStatus.PENDING_DEACTIVATION.value,
-        "expiration_date": (datetime.utcnow() + timedelta(days=30)).isoformat() + "Z",
-        "created_by": "admin",
-        "created_at": (datetime.utcnow() - timedelta(days=60)).isoformat() + "Z",
-        "deactivated_at": None,
-    }
-    keys.append(mlcws_key1)
-
-    # MLCWS_PROD: 1 expired inactive key
-    mlcws_key2_plain = generate_secret_key()
-    mlcws_key2 = {
-        "id": "mlcws-prod-key-002-expired",
-        "client_id": "MLCWS_PROD",
-        "key_alias": "MLCWS Prod Key 2024-Q3 (Expired)",
-        "encrypted_secret": encrypt_secret(mlcws_key2_plain),
-        "status": KeyStatus.INACTIVE.value,
-        "expiration_date": (datetime.utcnow() - timedelta(days=60)).isoformat() + "Z",
-        "created_by": "admin",
-        "created_at": (datetime.utcnow() - timedelta(days=150)).isoformat() + "Z",
-        "deactivated_at": (datetime.utcnow() - timedelta(days=60)).isoformat() + "Z",
-    }
-    keys.append(mlcws_key2)
-
-    # Create the database structure
-    data = {"keys": keys}
-
-    # Write to file
-    output_path = Path(__file__).parent / "data" / "keys.json"
-    output_path.parent.mkdir(exist_ok=True)
-
-    with open(output_path, "w") as f:
-        json.dump(data, f, indent=2)
-
-    print(f"Sample data generated successfully at {output_path}")
+    # Generate the sample keys, keeping each plaintext secret by its label
+    plaintext_secrets = {}
+    keys = []
+    for sample in SAMPLE_KEYS:
+        plaintext, key_record = _make_key(sample, now, now_ns)
+        plaintext_secrets[sample.label] = plaintext
+        keys.append(key_record)
+
+    # Replace any existing records with the sample keys in one transaction
+    with db.transaction():
+        db.clear()
+        for key_record in keys:
+            db.add_key(key_record)
+
+    print(f"Sample data generated successfully at {db.db_path}")
     print(f"\nGenerated {len(keys)} keys:")
     print(f"  - MLM_PROD: 2 active, 1 inactive")
     print(f"  - MLCES_PROD: 1 active")
@@ -128,14 +147,11 @@ def generate_sample_data():
 
     # Save plaintext secrets for testing
     secrets_file = Path(__file__).parent / "data" / "plaintext_secrets.txt"
+    secrets_file.parent.mkdir(exist_ok=True)
     with open(secrets_file, "w") as f:
         f.write("# Plaintext secrets for testing (DO NOT COMMIT IN PRODUCTION!)\n\n")
-        f.write(f"MLM_PROD Active Key 1: {mlm_key1_plain}\n")
-        f.write(f"MLM_PROD Active Key 2: {mlm_key2_plain}\n")
-        f.write(f"MLM_PROD Inactive Key: {mlm_key3_plain}\n")
-        f.write(f"MLCES_PROD Active Key: {mlces_key1_plain}\n")
-        f.write(f"MLCWS_PROD Pending Key: {mlcws_key1_plain}\n")
-        f.write(f"MLCWS_PROD Expired Key: {mlcws_key2_plain}\n")
+        for label, plaintext in plaintext_secrets.items():
+            f.write(f"{label}: {plaintext}\n")
 
     print(f"\nPlaintext secrets saved to {secrets_file} for testing purposes")
 
@@ -0,0 +1,29 @@
+"""Shared fixtures for the test suite"""
+
+import os
+
+# Keep the module-level database out of data/ while the tests run
+os.environ["DATABASE_PATH"] = ":memory:"
+
+import pytest
+
+from app import database, key_service, validation_service
+from app.database import KeyDatabase
+
+
+@pytest.fixture(scope="session")
+def shared_db():
+    """In-memory database created once for the whole test session"""
+    db = KeyDatabase(":memory:")
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def temp_db(shared_db, monkeypatch):
+    """Provide an empty database and point the services at it"""
+    shared_db.clear()
+    # Services bind db at import time, so patch every module that holds it
+    for module in (database, key_service, validation_service):
+        monkeypatch.setattr(module, "db", shared_db)
+    return shared_db
@@ -1,5 +1,7 @@
 """Tests for cryptography module"""
 
+import base64
+
 import pytest
 
 from app.crypto import (
@@ -7,6 +9,7 @@ from app.crypto import (
     decrypt_secret,
     derive_encryption_key,
     encrypt_secret,
+    fingerprint_secret,
     generate_secret_key,
 )
 
@@ -60,7 +63,66 @@ def test_compare_secrets_invalid():
     assert compare_secrets(plaintext2, encrypted1) is False
 
 
+def test_fingerprint_secret_deterministic():
+    """Test that fingerprints are stable per secret and differ between secrets"""
+    plaintext1 = generate_secret_key()
+    plaintext2 = generate_secret_key()
+
+    assert fingerprint_secret(plaintext1) == fingerprint_secret(plaintext1)
+    assert fingerprint_secret(plaintext1) != fingerprint_secret(plaintext2)
+    assert plaintext1 not in fingerprint_secret(plaintext1)
+
+
 def test_decrypt_invalid_token():
     """Test that decrypting invalid data raises an error"""
     with pytest.raises(ValueError):
         decrypt_secret("invalid-encrypted-data")
+
+
+def test_decrypt_tampered_ciphertext():
+    """Test that a modified ciphertext fails authentication"""
+    encrypted = encrypt_secret(generate_secret_key())
+    payload = bytearray(base64.b64decode(encrypted))
+    payload[-1] ^= 0x01
+
+    with pytest.raises(ValueError):
+        decrypt_secret(base64.b64encode(bytes(payload)).decode())
+
+
+def test_derive_encryption_key_cache(tmp_path, monkeypatch):
+    """Test that the opt-in KDF cache stores a private key and reuses it"""
+    from app import crypto
+
+    monkeypatch.setattr(crypto, "KDF_CACHE_ENABLED", True)
+    monkeypatch.setattr(crypto, "_kdf_cache_dir", lambda: tmp_path)
+
+    key = derive_encryption_key("test-password")
+    cache_files = list(tmp_path.iterdir())
+    assert len(cache_files) == 1
+    assert cache_files[0].stat().st_mode & 0o777 == 0o600
+    assert cache_files[0].read_bytes() == key
+
+    # A cached key is returned without re-deriving
+    cache_files[0].write_bytes(b"x" * 32)
+    assert derive_encryption_key("test-password") == b"x" * 32
+
+
+def test_derive_encryption_key_cache_without_home(monkeypatch):
+    """Test that the KDF cache is skipped when no home directory resolves"""
+    from pathlib import Path
+
+    from app import crypto
+
+    def no_home():
+        raise RuntimeError("Could not determine home directory.")
+
+    monkeypatch.setattr(crypto, "KDF_CACHE_ENABLED", True)
+    monkeypatch.setattr(Path, "home", no_home)
+
+    assert len(derive_encryption_key("test-password")) == 32
+
+
+def test_compare_secrets_invalid_token():
+    """Test that comparing against undecryptable data raises an error"""
+    with pytest.raises(ValueError):
+        compare_secrets(generate_secret_key(), "invalid-encrypted-data")
@@ -1,13 +1,7 @@
 """Tests for key service module"""
 
-import os
-import tempfile
 from datetime import datetime
 
-import pytest
-
-from app import database
-from app.database import KeyDatabase
 from app.key_service import (
     create_key,
     deactivate_key,
@@ -18,24 +12,6 @@ from app.key_service import (
 from app.models import KeyStatus
 
 
-@pytest.fixture
-def temp_db():
-    """Create a temporary database for testing"""
-    # Create a temporary file
-    fd, path = tempfile.mkstemp(suffix=".json")
-    os.close(fd)
-
-    # Replace the global db instance
-    original_db = database.db
-    database.db = KeyDatabase(path)
-
-    yield database.db
-
-    # Cleanup
-    database.db = original_db
-    os.unlink(path)
-
-
 def test_create_key(temp_db):
     """Test creating a new key"""
     response = create_key(
@@ -66,3 +42,86 @@ def test_get_key_status_not_found(temp_db):
     """Test getting status of non-existent key"""
     status = get_key_status("non-existent-id")
     assert status is None
+
+
+def test_get_active_key_count(temp_db):
+    """Test that only active keys are counted"""
+    key = create_key("CLIENT_COUNT", "Key 1", "admin")
+    create_key("CLIENT_COUNT", "Key 2", "admin")
+    assert get_active_key_count("CLIENT_COUNT") == 2
+
+    deactivate_key(key.id)
+    assert get_active_key_count("CLIENT_COUNT") == 1
+
+
+def test_create_key_rotates_oldest_key(temp_db):
+    """Test that creating a third key deactivates the oldest active key"""
+    key1 = create_key("CLIENT_ROTATE", "Key 1", "admin")
+    key2 = create_key("CLIENT_ROTATE", "Key 2", "admin")
+    key3 = create_key("CLIENT_ROTATE", "Key 3", "admin")
+
+    assert get_active_key_count("CLIENT_ROTATE") == 2
+    assert get_key_status(key1.id).status == KeyStatus.INACTIVE
+    assert get_key_status(key1.id).deactivated_at is not None
+    assert get_key_status(key2.id).status == KeyStatus.ACTIVE
+    assert get_key_status(key3.id).status == KeyStatus.ACTIVE
+
+
+def test_concurrent_create_key_respects_limit(temp_db):
+    """Test that concurrent key creation never leaves more than 2 active keys"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(
+            executor.map(
+                lambda i: create_key("CLIENT_CONCURRENT", f"Key {i}", "admin"),
+                range(16),
+            )
+        )
+
+    assert len(list_keys_for_client("CLIENT_CONCURRENT")) == 16
+    assert get_active_key_count("CLIENT_CONCURRENT") == 2
+
+
+def test_create_key_rolls_back_failed_commit(temp_db, monkeypatch):
+    """Test that a failed COMMIT is rolled back and later writes still work"""
+    import sqlite3
+
+    import pytest
+
+    conn = temp_db._conn
+
+    class FailingCommitConnection:
+        """Connection wrapper whose COMMIT fails like a busy database"""
+
+        in_transaction = property(lambda self: conn.in_transaction)
+
+        def execute(self, sql, *args):
+            if sql == "COMMIT":
+                raise sqlite3.OperationalError("database is locked")
+            return conn.execute(sql, *args)
+
+    monkeypatch.setattr(temp_db, "_conn", FailingCommitConnection())
+    with pytest.raises(sqlite3.OperationalError):
+        create_key("CLIENT_COMMIT", "Key 1", "admin")
+    monkeypatch.setattr(temp_db, "_conn", conn)
+
+    assert not conn.in_transaction
+    assert list_keys_for_client("CLIENT_COMMIT") == []
+    create_key("CLIENT_COMMIT", "Key 2", "admin")
+    assert get_active_key_count("CLIENT_COMMIT") == 1
+
+
+def test_update_key_rejects_invalid_values(temp_db):
+    """Test that invalid updates are rejected before anything is written"""
+    import pytest
+
+    key = create_key("CLIENT_UPDATE", "Key 1", "admin")
+
+    for updates in ({"status": "Bogus"}, {"created_seq": "x"}):
+        with pytest.raises(ValueError):
+            temp_db.update_key(key.id, updates)
+
+    stored = get_key_status(key.id)
+    assert stored.status == KeyStatus.ACTIVE
+    assert [k.id for k in list_keys_for_client("CLIENT_UPDATE")] == [key.id]
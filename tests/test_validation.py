@@ -1,31 +1,14 @@
 """Tests for validation service"""
 
-import os
-import tempfile
+from datetime import timedelta
 
 import pytest
 
-from app import database
-from app.database import KeyDatabase
 from app.key_service import create_key
+from app.models import utc_now
 from app.validation_service import validate_key, validate_key_secure
 
 
-@pytest.fixture
-def temp_db():
-    """Create a temporary database for testing"""
-    fd, path = tempfile.mkstemp(suffix=".json")
-    os.close(fd)
-
-    original_db = database.db
-    database.db = KeyDatabase(path)
-
-    yield database.db
-
-    database.db = original_db
-    os.unlink(path)
-
-
 def test_validate_active_key(temp_db):
     """Test validating an active key"""
     # Create a key
@@ -39,6 +22,7 @@ def test_validate_active_key(temp_db):
     assert result["valid"] is True
     assert result["message"] == "Key validation successful"
     assert "error" not in result or result["error"] is None
+    assert "debug_info" not in result
 
 
 def test_validate_wrong_secret(temp_db):
@@ -80,12 +64,10 @@ def test_validate_key_secure_method(temp_db):
 
 def test_validate_expired_key(temp_db):
     """Test validating an expired key"""
-    from datetime import datetime, timedelta
-
     from app.key_service import create_key as create_key_func
 
     # Create a key with expiration in the past directly
-    expiration_date = datetime.utcnow() - timedelta(days=1)
+    expiration_date = utc_now() - timedelta(days=1)
 
     # Import and call the function directly with expiration
     import sys
@@ -105,3 +87,62 @@ def test_validate_expired_key(temp_db):
 
     assert result["valid"] is False
     assert "expired" in result["error"].lower()
+
+
+def test_validate_inactive_key_hides_key_material(temp_db):
+    """Test that a failed validation does not echo stored key material"""
+    from app.key_service import deactivate_key
+
+    response = create_key("CLIENT_INACTIVE", "Key 1", "admin")
+    deactivate_key(response.id)
+
+    result = validate_key("CLIENT_INACTIVE", response.plaintext_secret)
+
+    assert result["valid"] is False
+    assert result["error"] == "Key is Inactive"
+    assert "debug_info" not in result
+
+
+def test_validate_key_expiring_in_future(temp_db):
+    """Test that a key with a future expiration date is still valid"""
+    response = create_key(
+        "CLIENT_NOT_EXPIRED",
+        "Key 1",
+        "admin",
+        expiration_date=utc_now() + timedelta(days=1),
+    )
+
+    assert validate_key_secure("CLIENT_NOT_EXPIRED", response.plaintext_secret)
+
+
+def test_validate_key_expired_by_update(temp_db):
+    """Test that moving a key's expiration into the past makes it invalid"""
+    never_expires = create_key("CLIENT_UPDATED", "Key 1", "admin")
+    expires_later = create_key(
+        "CLIENT_UPDATED",
+        "Key 2",
+        "admin",
+        expiration_date=utc_now() + timedelta(days=1),
+    )
+
+    past = utc_now() - timedelta(days=1)
+    for response in (never_expires, expires_later):
+        temp_db.update_key(response.id, {"expiration_date": past})
+
+        result = validate_key("CLIENT_UPDATED", response.plaintext_secret)
+
+        assert result["valid"] is False
+        assert "expired" in result["error"].lower()
+
+    with pytest.raises(ValueError):
+        temp_db.update_key(never_expires.id, {"expiration_ts": None})
+
+
+def test_validate_unencodable_secret(temp_db):
+    """Test that a secret that cannot be encoded is rejected, not an error"""
+    create_key("CLIENT_UNENCODABLE", "Key 1", "admin")
+
+    result = validate_key("CLIENT_UNENCODABLE", "bad-\ud800-secret")
+
+    assert result["valid"] is False
+    assert result["error"] == "Key not found for this client"